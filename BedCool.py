@@ -61,33 +61,47 @@ class BedCool(Script):
 
         change_layer_start = (num_layers - 2) - num_final_layers
         current_bed_temp = 0
-        for layer_i, layer in enumerate(data[:-2]):
-            lines = layer.split('\n')
-            for line in lines:
-                if line.startswith('M140 S'):
-                    current_bed_temp = round(float(line[6:]))
+        m140 = 'M140 S'
+        # range() rather than enumerate(data[:-2]) to avoid copying the layer list
+        for layer_i in range(num_layers - 2):
+            layer = data[layer_i]
+            # Only the last M140 in a layer matters, so look for it directly from the end and
+            # parse just that one value - no line split needed
+            pos = layer.rfind(m140)
+            while pos > 0 and layer[pos - 1] != '\n':
+                # Ignore mid-line occurrences (e.g. inside a comment)
+                pos = layer.rfind(m140, 0, pos)
+            if pos != -1:
+                end = layer.find('\n', pos + 6)
+                # Slicers emit integer temps; int() parses much faster than float()
+                temp = layer[pos + 6:] if end == -1 else layer[pos + 6:end]
+                current_bed_temp = int(temp) if '.' not in temp else round(float(temp))
+            elif layer_i < change_layer_start:
+                continue
 
             if layer_i >= change_layer_start and current_bed_temp > 0:
                 current_bed_temp -= reduce_by
-                gcode = 'M140 S{}'.format(round(current_bed_temp))
-                lines[1:1] = [gcode]
-
-            data[layer_i] = '\n'.join(lines)
+                gcode = 'M140 S{}'.format(int(current_bed_temp + 0.5))
+                # Splice the one-line edit in after the first line instead of split+insert+join
+                nl = layer.find('\n')
+                if nl == -1:
+                    data[layer_i] = layer + '\n' + gcode
+                else:
+                    data[layer_i] = layer[:nl + 1] + gcode + '\n' + layer[nl + 1:]
 
         return data
 
 if __name__ == '__main__':
-    with open(args[0]) as f:
+    with open(args[0], newline='') as f:
         file = f.read()
     idx = file.find('; custom gcode: start_gcode')
-    data = [file[0:idx]]
-    while idx != -1:
-        nidx = file.find(';LAYER_CHANGE\n', idx + 1)
-        data.append(file[idx:nidx])
-        idx = nidx
+    # Single O(N) split instead of repeated find() rescans on multi-MB files
+    layers = file[idx:].split(';LAYER_CHANGE\n')
+    data = [file[0:idx], layers[0]]
+    data += [';LAYER_CHANGE\n' + layer for layer in layers[1:]]
     idx = data[-1].rfind('; custom gcode: end_gcode')
     data[-1:] = [data[-1][0:idx], data[-1][idx:], '']
 
     BedCool().execute(data)
-    with open(args[0], 'w') as f:
+    with open(args[0], 'w', newline='') as f:
         f.writelines(data)
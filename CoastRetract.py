@@ -70,6 +70,8 @@ if __name__ == "__main__":
     # Standalone script
     from optparse import OptionParser
     parser = OptionParser()
+    parser.add_option('--jobs', type='int', default=0,
+                      help='worker processes to use on large files, 0 picks automatically')
     (options, args) = parser.parse_args()
     class Script:
         def getSettingValueByKey(self, key):
@@ -78,20 +80,20 @@ if __name__ == "__main__":
         def log(level, message):
             print(level, message)
 
-    retract_re = re.compile(r"^G1 E(-[0-9]+[.]?[0-9]*) F([0-9]+)")
+    retract_re = re.compile(r"^G1 E(-[0-9]+[.]?[0-9]*) F([0-9]+)", re.M | re.ASCII)
     retract_amount_i = 0
     retract_speed_i = 1
-    travel_re = re.compile(r"^G1 (.+)")
+    travel_re = re.compile(r"^G1 (.+)", re.ASCII)
 else:
     # Cura API
     from ..Script import Script
     from UM.Logger import Logger
     __version__ = '1.0'
 
-    retract_re = re.compile(r"^G1 F([0-9]+) E(-[0-9]+[.]?[0-9]*)")
+    retract_re = re.compile(r"^G1 F([0-9]+) E(-[0-9]+[.]?[0-9]*)", re.M | re.ASCII)
     retract_speed_i = 0
     retract_amount_i = 1
-    travel_re = re.compile(r"^G[01] ?F?[0-9]* (.+)")
+    travel_re = re.compile(r"^G[01] ?F?[0-9]* (.+)", re.ASCII)
 
 
 class CoastRetract(Script):
@@ -106,43 +108,88 @@ class CoastRetract(Script):
         }
 
     def execute(self, data):
+        # Bind bound methods once; attribute lookups add up over millions of lines
+        find_retracts = retract_re.finditer
+        match_travel = travel_re.match
         for layer_i, layer in enumerate(data):
-            lines = layer.split("\n")
-            for idx, line in enumerate(lines):
-                match = retract_re.match(line)
-                if not match:
-                    continue
-                for i in range(idx - 1, -1, -1):
-                    if not lines[i].startswith('G'):
-                        # Skip past comments or non-relevant instructions
-                        continue
-                    travel_match = travel_re.match(lines[i])
-                    if lines[i].find(" E") != -1:
-                        travel_match = None
-                    break
-                else:
-                    continue
+            # Retracts always contain 'E-'; skip layers without any
+            if 'E-' not in layer:
+                continue
+            # finditer locates every retract in one engine pass instead of one match per line.
+            # Edits are collected as (start, end, replacement) spans, in ascending order.
+            edits = []
+            for match in find_retracts(layer):
+                travel_match = None
+                end = match.start() - 1
+                while end > 0:
+                    start = layer.rfind('\n', 0, end) + 1
+                    prev = layer[start:end]
+                    if prev[:1] == 'G':
+                        travel_match = match_travel(prev)
+                        if prev.find(" E") != -1:
+                            travel_match = None
+                        break
+                    # Skip past comments or non-relevant instructions
+                    end = start - 1
                 if not travel_match:
                     continue
 
-                amount = float(match.groups()[retract_amount_i])
+                groups = match.groups()
+                amount = float(groups[retract_amount_i])
                 # In theory, we should increase the speed of the combined move. In practice, it doesn't
                 # matter since sqrt(coast_distance^2 + retract_distace^2) ~= retract_distace
-                speed = round(float(match.groups()[retract_speed_i]))
-
-                # Combine into single move
-                lines[i] = "G1 F{} {} E{:.3f}".format(speed, travel_match.groups()[0], amount)
-                lines[i] = lines[i].rstrip('0').rstrip('.')
-                lines[idx] = None
-
-            data[layer_i] = "\n".join(line for line in lines if line is not None)
+                speed = int(groups[retract_speed_i])
+
+                # Combine into single move; :g drops trailing zeros in one formatting pass
+                combined = "G1 F{} {} E{:g}".format(speed, travel_match.groups()[0],
+                                                    round(amount, 3))
+                edits.append((start, end, combined))
+                # Drop the retract line along with one newline
+                nl = layer.find('\n', match.end())
+                if nl == -1:
+                    edits.append((max(match.start() - 1, 0), len(layer), ''))
+                else:
+                    edits.append((match.start(), nl + 1, ''))
+
+            if edits:
+                parts = []
+                last = 0
+                for start, end, text in edits:
+                    parts.append(layer[last:start])
+                    parts.append(text)
+                    last = end
+                parts.append(layer[last:])
+                data[layer_i] = ''.join(parts)
 
         return data
 
 if __name__ == "__main__":
-    with open(args[0]) as f:
-        data = [f.read()]
-
-    CoastRetract().execute(data)
-    with open(args[0], "w") as f:
+    with open(args[0], newline='') as f:
+        file = f.read()
+
+    jobs = options.jobs
+    if jobs != 1:
+        # Workers must fork: a spawned child re-imports this module as __mp_main__ and would
+        # take the Cura API branch. Without fork (Windows) stay sequential.
+        import multiprocessing
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            jobs = 1
+    if jobs == 0:
+        import os
+        jobs = (os.cpu_count() or 1) if len(file) > 4 * 1024 * 1024 else 1
+    if jobs > 1:
+        # Layers are independent so chunks of them can be processed in parallel. A retract right
+        # at a chunk boundary is left uncombined, which is both safe and rare.
+        from concurrent.futures import ProcessPoolExecutor
+        parts = file.split(';LAYER_CHANGE\n')
+        parts[1:] = [';LAYER_CHANGE\n' + part for part in parts[1:]]
+        step = -(-len(parts) // jobs)
+        chunks = [[''.join(parts[i:i + step])] for i in range(0, len(parts), step)]
+        with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context('fork')) as pool:
+            data = [chunk[0] for chunk in pool.map(CoastRetract().execute, chunks)]
+    else:
+        data = [file]
+        CoastRetract().execute(data)
+
+    with open(args[0], 'w', newline='') as f:
         f.writelines(data)
@@ -67,43 +67,51 @@ class TempRamp(Script):
 
         target_temp = 0
         current_temp = 0
-        for layer_i, layer in enumerate(data[:-2]):
+        m104 = 'M104 S'
+        # range() rather than enumerate(data[:-2]) to avoid copying the layer list
+        for layer_i in range(len(data) - 2):
+            layer = data[layer_i]
+            # Skip the split+join round-trip unless the layer sets a temp or a ramp is pending
+            if current_temp >= target_temp and m104 not in layer:
+                continue
             lines = layer.split('\n')
 
             for line_i, line in enumerate(lines):
-                if line.startswith('M104 S'):
+                if line[:6] == m104:
+                    # Slicers emit integer temps; int() parses several times faster than float()
+                    temp = line[6:]
+                    temp = int(temp) if '.' not in temp else float(temp)
                     if current_temp == 0:
-                        current_temp = float(line[6:])
-                        target_temp = current_temp
+                        current_temp = temp
+                        target_temp = temp
                     else:
-                        target_temp = float(line[6:])
+                        target_temp = temp
                         if target_temp <= current_temp + increase_by:
                             current_temp = target_temp
                         else:
                             current_temp += increase_by
-                            lines[line_i] = 'M104 S{}'.format(round(current_temp))
+                            lines[line_i] = 'M104 S{}'.format(int(current_temp + 0.5))
 
             if current_temp < target_temp:
                 current_temp = min(current_temp + increase_by, target_temp)
-                gcode = 'M104 S{}'.format(round(current_temp))
+                gcode = 'M104 S{}'.format(int(current_temp + 0.5))
                 lines[-1:-1] = [gcode]
 
-            data[layer_i] = '\n'.join(line for line in lines if line is not None)
+            data[layer_i] = '\n'.join(lines)
 
         return data
 
 if __name__ == '__main__':
-    with open(args[0]) as f:
+    with open(args[0], newline='') as f:
         file = f.read()
     idx = file.find('; custom gcode: start_gcode')
-    data = [file[0:idx]]
-    while idx != -1:
-        nidx = file.find(';LAYER_CHANGE\n', idx + 1)
-        data.append(file[idx:nidx])
-        idx = nidx
+    # Single O(N) split instead of repeated find() rescans on multi-MB files
+    layers = file[idx:].split(';LAYER_CHANGE\n')
+    data = [file[0:idx], layers[0]]
+    data += [';LAYER_CHANGE\n' + layer for layer in layers[1:]]
     idx = data[-1].rfind('; custom gcode: end_gcode')
     data[-1:] = [data[-1][0:idx], data[-1][idx:], '']
 
     TempRamp().execute(data)
-    with open(args[0], 'w') as f:
+    with open(args[0], 'w', newline='') as f:
         f.writelines(data)
@@ -42,8 +42,8 @@ if __name__ == '__main__':
         def getSettingValueByKey(self, key):
             return args.__getattribute__(key)
 
-    retract_re = re.compile(r'^G1 E(-[0-9]+[.]?[0-9]*) F([0-9]+)')
-    prime_re = re.compile(r'^G1 E([0-9]+[.]?[0-9]*) F([0-9]+)')
+    retract_re = re.compile(r'^G1 E(-[0-9]+[.]?[0-9]*) F([0-9]+)', re.ASCII)
+    prime_re = re.compile(r'^G1 E([0-9]+[.]?[0-9]*) F([0-9]+)', re.ASCII)
     re_amount_i = 0
     re_speed_i = 1
 else:
@@ -51,11 +51,33 @@ else:
     from ..Script import Script
     __version__ = '1.0'
 
-    retract_re = re.compile(r'^G1 F([0-9]+) E(-[0-9]+[.]?[0-9]*)')
-    prime_re = re.compile(r'^G1 F([0-9]+) E([0-9]+[.]?[0-9]*)')
+    retract_re = re.compile(r'^G1 F([0-9]+) E(-[0-9]+[.]?[0-9]*)', re.ASCII)
+    prime_re = re.compile(r'^G1 F([0-9]+) E([0-9]+[.]?[0-9]*)', re.ASCII)
     re_speed_i = 0
     re_amount_i = 1
 
+# Per-command gcode template, LCD label and whether the value is rounded to an int. A None
+# template means the command is LCD-only and does its work through per-line edits instead.
+command_formats = {
+    'speed': ('M220 S{}', 'Speed', True),
+    'acceleration': ('M204 S{}', 'Accel', True),
+    'tacceleration': ('M204 T{}', 'TAccel', True),
+    'pacceleration': ('M204 P{}', 'PAccel', True),
+    'racceleration': ('M204 R{}', 'RAccel', True),
+    'eacceleration': ('M201 E{}', 'EAccel', True),
+    'jerk': ('M205 X{0:.2f} Y{0:.2f}', 'XYJerk', False),
+    'zjerk': ('M205 Z{:.2f}', 'ZJerk', False),
+    'ejerk': ('M205 E{:.2f}', 'EJerk', False),
+    'junction': ('M205 J{:.3f}', 'Junction', False),
+    'lin-advance': ('M900 K{:.3f}', 'Lin Adv', False),
+    'nozzle-temp': ('M104 S{}', 'Nozzle Temp', True),
+    'bed-temp': ('M104 S{}', 'Bed Temp', True),
+    'retract-speed': (None, 'Retract Speed {}', True),
+    'retract-distance': (None, 'Retract Dist {:.3f}', False),
+    'prime-speed': (None, 'Prime Speed {}', True),
+    'extra-prime': (None, 'Extra Prime {:.3f}', False),
+}
+
 class TestingTower(Script):
 
     def getSettingData(self):
@@ -132,100 +154,116 @@ class TestingTower(Script):
 
         current_value = start_value - value_change
 
+        # Bind bound methods once; attribute lookups add up over millions of lines
+        match_retract = retract_re.match
+        match_prime = prime_re.match
+
+        # Only these commands rewrite individual lines; the rest only add layer headers
+        edits_lines = command in ('retract-speed', 'retract-distance', 'prime-speed', 'extra-prime')
+
+        # command is fixed for the whole call, so resolve how to format it just once
+        gcode_fmt, label, as_int = command_formats[command]
+
         num_layers = len(data)
+
+        # The value sequence is fixed up front, so generate every header string once here
+        # instead of formatting inside the layer loop
+        num_changes = max(0, (num_layers - 2 - start_layer + change_value_every - 1)
+                          // change_value_every)
+        headers = []
+        change_value = start_value - value_change
+        for change_i in range(num_changes):
+            change_value += value_change
+            value = round(change_value) if as_int else change_value
+            if gcode_fmt:
+                gcode = gcode_fmt.format(value)
+                lcd_gcode = 'M117 {} {}'.format(label, gcode)
+                if command == 'speed' and change_i == 0:
+                    gcode = 'M220 B\n' + gcode
+                headers.append(gcode + '\n' + lcd_gcode)
+            else:
+                headers.append('M117 ' + label.format(value))
+
         current_prime = -1
-        for layer_i, layer in enumerate(data[:-2]):
-            if layer_i < start_layer:
+        # range() rather than enumerate(data[:-2]) to avoid copying the layer list
+        for layer_i in range(start_layer, num_layers - 2):
+            layer = data[layer_i]
+            # Skip the split+join round-trip on layers that get neither a header nor line edits
+            if not edits_lines and (layer_i - start_layer) % change_value_every != 0 \
+                    and (command != 'speed' or layer_i != num_layers - 3):
                 continue
 
-            lines = layer.split('\n')
-            if (layer_i - start_layer) % change_value_every == 0:
+            header = None
+            offset = layer_i - start_layer
+            if offset % change_value_every == 0:
                 current_value += value_change
-                gcode = None
-                if command == 'speed':
-                    gcode = 'M220 S{}'.format(round(current_value))
-                    lcd_gcode = 'M117 Speed ' + gcode
-                    if layer_i == start_layer:
-                        gcode = 'M220 B\n' + gcode
-                elif command == 'acceleration':
-                    gcode = 'M204 S{}'.format(round(current_value))
-                    lcd_gcode = 'M117 Accel ' + gcode
-                elif command == 'tacceleration':
-                    gcode = 'M204 T{}'.format(round(current_value))
-                    lcd_gcode = 'M117 TAccel ' + gcode
-                elif command == 'pacceleration':
-                    gcode = 'M204 P{}'.format(round(current_value))
-                    lcd_gcode = 'M117 PAccel ' + gcode
-                elif command == 'racceleration':
-                    gcode = 'M204 R{}'.format(round(current_value))
-                    lcd_gcode = 'M117 RAccel ' + gcode
-                elif command == 'eacceleration':
-                    gcode = 'M201 E{}'.format(round(current_value))
-                    lcd_gcode = 'M117 EAccel ' + gcode
-                elif command == 'jerk':
-                    gcode = 'M205 X{:.2f} Y{:.2f}'.format(current_value, current_value)
-                    lcd_gcode = 'M117 XYJerk ' + gcode
-                elif command == 'zjerk':
-                    gcode = 'M205 Z{:.2f}'.format(current_value)
-                    lcd_gcode = 'M117 ZJerk ' + gcode
-                elif command == 'ejerk':
-                    gcode = 'M205 E{:.2f}'.format(current_value)
-                    lcd_gcode = 'M117 EJerk ' + gcode
-                elif command == 'junction':
-                    gcode = 'M205 J{:.3f}'.format(current_value)
-                    lcd_gcode = 'M117 Junction ' + gcode
-                elif command == 'lin-advance':
-                    gcode = 'M900 K{:.3f}'.format(current_value)
-                    lcd_gcode = 'M117 Lin Adv ' + gcode
-                elif command == 'nozzle-temp':
-                    gcode = 'M104 S{}'.format(round(current_value))
-                    lcd_gcode = 'M117 Nozzle Temp ' + gcode
-                elif command == 'bed-temp':
-                    gcode = 'M104 S{}'.format(round(current_value))
-                    lcd_gcode = 'M117 Bed Temp ' + gcode
-                elif command == 'retract-speed':
-                    lcd_gcode = 'M117 Retract Speed {}'.format(round(current_value))
-                elif command == 'retract-distance':
-                    lcd_gcode = 'M117 Retract Dist {:.3f}'.format(current_value)
-                elif command == 'prime-speed':
-                    lcd_gcode = 'M117 Prime Speed {}'.format(round(current_value))
-                elif command == 'extra-prime':
-                    lcd_gcode = 'M117 Extra Prime {:.3f}'.format(current_value)
+                header = headers[offset // change_value_every]
 
-                lines[1:1] = [gcode, lcd_gcode] if gcode else [lcd_gcode]
+            if not edits_lines:
+                # Splice the header in after the first line instead of split+insert+join
+                if header:
+                    nl = layer.find('\n')
+                    if nl == -1:
+                        layer = layer + '\n' + header
+                    else:
+                        layer = layer[:nl + 1] + header + '\n' + layer[nl + 1:]
+                if layer_i == num_layers - 3 and command == 'speed':
+                    nl = layer.rfind('\n')
+                    if nl == -1:
+                        layer += '\nM220 R'
+                    else:
+                        layer = layer[:nl] + '\nM220 R' + layer[nl:]
+                data[layer_i] = layer
+                continue
 
-            for line_i, line in enumerate(lines):
-                if command == 'retract-speed':
-                    match = retract_re.match(line)
+            lines = layer.split('\n')
+            if header:
+                lines[0] += '\n' + header
+
+            # One specialized loop per command so the hot path doesn't re-test command per line.
+            if command == 'retract-speed':
+                for line_i, line in enumerate(lines):
+                    # Literal prefilters; far cheaper than entering the regex engine per line
+                    if line[:3] != 'G1 ' or 'E-' not in line:
+                        continue
+                    match = match_retract(line)
                     if match:
+                        # Speeds are non-negative so int(x + 0.5) rounds like round(), faster
                         lines[line_i] = 'G1 F{} E{}'.format(
-                            round(current_value * 60), match.groups()[re_amount_i])
-                elif command == 'retract-distance':
-                    match = retract_re.match(line)
+                            int(current_value * 60 + 0.5), match.groups()[re_amount_i])
+            elif command == 'retract-distance':
+                for line_i, line in enumerate(lines):
+                    if line[:3] != 'G1 ' or ' E' not in line:
+                        continue
+                    match = match_retract(line)
                     if match:
                         lines[line_i] = 'G1 F{} E{:.3f}'.format(
                             match.groups()[re_speed_i], -current_value)
                         current_prime = current_value
                         continue
-                    match = prime_re.match(line)
+                    match = match_prime(line)
                     if match:
                         if current_prime != -1:
                             lines[line_i] = 'G1 F{} E{:.3f}'.format(
                                 match.groups()[re_speed_i], current_prime)
-                elif command == 'prime-speed':
-                    match = prime_re.match(line)
+            elif command == 'prime-speed':
+                for line_i, line in enumerate(lines):
+                    if line[:3] != 'G1 ' or ' E' not in line:
+                        continue
+                    match = match_prime(line)
                     if match:
                         lines[line_i] = 'G1 F{} E{}'.format(
-                            round(current_value * 60), match.groups()[re_amount_i])
-                elif command == 'extra-prime':
-                    match = prime_re.match(line)
+                            int(current_value * 60 + 0.5), match.groups()[re_amount_i])
+            elif command == 'extra-prime':
+                for line_i, line in enumerate(lines):
+                    if line[:3] != 'G1 ' or ' E' not in line:
+                        continue
+                    match = match_prime(line)
                     if match:
-                        prime_distance = float(match.groups()[re_amount_i]) + current_value
+                        groups = match.groups()
+                        prime_distance = float(groups[re_amount_i]) + current_value
                         lines[line_i] = 'G1 F{} E{:.3f}'.format(
-                            match.groups()[re_speed_i], prime_distance)
-
-            if layer_i == num_layers - 3 and command == 'speed':
-                lines.insert(-1, 'M220 R')
+                            groups[re_speed_i], prime_distance)
 
             data[layer_i] = '\n'.join(lines)
 
@@ -244,17 +282,16 @@ if __name__ == '__main__':
     parser.add_argument(metavar='gcode-file', dest='gcode_file')
     args = parser.parse_args()
 
-    with open(args.gcode_file) as f:
+    with open(args.gcode_file, newline='') as f:
         file = f.read()
     idx = file.find('; custom gcode: start_gcode')
-    data = [file[0:idx]]
-    while idx != -1:
-        nidx = file.find(';LAYER_CHANGE\n', idx + 1)
-        data.append(file[idx:nidx])
-        idx = nidx
+    # Single O(N) split instead of repeated find() rescans on multi-MB files
+    layers = file[idx:].split(';LAYER_CHANGE\n')
+    data = [file[0:idx], layers[0]]
+    data += [';LAYER_CHANGE\n' + layer for layer in layers[1:]]
     idx = data[-1].rfind('; custom gcode: end_gcode')
     data[-1:] = [data[-1][0:idx], data[-1][idx:], '']
 
     TestingTower().execute(data)
-    with open(args.gcode_file, 'w') as f:
+    with open(args.gcode_file, 'w', newline='') as f:
         f.writelines(data)